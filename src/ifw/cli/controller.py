@@ -240,7 +240,7 @@ class CLIController:
     def _cleanup(self):
         """Cleanup resources before exit."""
         self.running = False
-        # Any additional cleanup can be added here
+        self.shell_executor.close()
 
     def stop(self):
         """Stop the CLI application gracefully."""
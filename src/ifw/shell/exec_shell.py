@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import os
 import pty
+import re
 import select
+import selectors
+import shlex
 import signal
 import subprocess
 import sys
@@ -9,38 +12,121 @@ import termios
 import tty
 import threading
 import time
-from typing import Optional, Callable
+from collections import deque
+from typing import Optional, Callable, Dict, List, Union
 import struct
 import fcntl
 
+# Signals Python ignores that child processes expect at their defaults
+_RESTORED_SIGNALS = tuple(
+    getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name)
+)
+
+# Number of commands kept in the shell history
+_MAX_HISTORY = 1000
+
+# ANSI color/erase sequences stripped from captured output
+_ANSI_RE = re.compile(rb"\x1b\[[0-9;]*[mK]")
+
+# Alternate screen entry: 1049 (buffer), 47 (older), 1047 (xterm)
+_ALT_SCREEN_RE = re.compile(rb"\x1b\[\?(?:1049|47|1047)h")
+
+# Signs that a program wants raw mode: alternate screen, application
+# cursor keys (?1h) or application keypad mode (ESC =)
+_RAW_MODE_RE = re.compile(rb"\x1b(?:\[\?(?:1049|1|47)h|=)")
+
+# Minimum interval between output callback deliveries, in seconds
+_CALLBACK_INTERVAL = 0.012
+
+# Size of the buffer PTY output is read into and written out from
+_READ_BUFFER_SIZE = 65536
+
+# Maximum number of buffers a single writev() call accepts
+_IOV_MAX = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in os.sysconf_names else 1024
+
+
+class _SpawnedProcess:
+    """Minimal Popen-like handle for a process started with os.posix_spawn."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+        # Like Popen, keep poll() from reaping the child under a blocking wait()
+        self._waitpid_lock = threading.Lock()
+
+    def poll(self) -> Optional[int]:
+        """Return the exit code if the process has exited, None otherwise."""
+        if self.returncode is None and self._waitpid_lock.acquire(False):
+            try:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+                if pid == self.pid:
+                    self.returncode = os.waitstatus_to_exitcode(status)
+            except ChildProcessError:
+                pass
+            finally:
+                self._waitpid_lock.release()
+        return self.returncode
+
+    def wait(self) -> int:
+        """Wait for the process to exit and return its exit code."""
+        with self._waitpid_lock:
+            if self.returncode is None:
+                _, status = os.waitpid(self.pid, 0)
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
 
 class ShellCommandExecutor:
     def __init__(self):
         # State persistence
         self.current_dir = os.getcwd()
-        self.env_vars = os.environ.copy()
-        self.shell_history = []
+        self.cwd_dirty = False
+        # Only variables we changed are tracked; the rest is inherited
+        self.env_overrides: Dict[str, str] = {}
+        self.shell_history = deque(maxlen=_MAX_HISTORY)
 
         # PTY management
         self.master_fd: Optional[int] = None
         self.slave_fd: Optional[int] = None
-        self.process: Optional[subprocess.Popen] = None
+        self.process: Optional[Union[subprocess.Popen, _SpawnedProcess]] = None
         self.original_settings = None
+        self.stdin_was_blocking: Optional[bool] = None
+        self.pidfd: Optional[int] = None
+        self.child_exited = False
+        # posix_spawn is only used where it can close inherited fds like
+        # Popen's close_fds (Python 3.13+); cleared the first time it turns
+        # out to lack setsid
+        self.use_posix_spawn = hasattr(os, "posix_spawnp") and hasattr(
+            os, "POSIX_SPAWN_CLOSEFROM"
+        )
 
         # Output capture
-        self.output_buffer = []
+        self.output_buffer = bytearray()
+        self.read_view = memoryview(bytearray(_READ_BUFFER_SIZE))
         self.capture_output = True
-        self.output_callback: Optional[Callable[[str], None]] = None
+        self.output_callback: Optional[Callable[[bytes], None]] = None
 
         # Threading for I/O handling
         self.io_thread: Optional[threading.Thread] = None
         self.stop_io = threading.Event()
 
+        # Self-pipe used to wake the I/O thread as soon as stop_io is set
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+
         # DYNAMIC alternate screen detection
         self.used_alternate_screen = False
+        self.raw_mode_set = False
+
+    def set_output_callback(self, callback: Callable[[bytes], None]):
+        """Set callback function to receive real-time output.
 
-    def set_output_callback(self, callback: Callable[[str], None]):
-        """Set callback function to receive real-time output."""
+        Output is delivered as raw bytes, batched to at most one call every
+        _CALLBACK_INTERVAL seconds. A batch may end in the middle of a UTF-8
+        sequence, so callers that need text should decode incrementally
+        (e.g. with codecs.getincrementaldecoder("utf-8")).
+        """
         self.output_callback = callback
 
     def execute_shell_command(self, command: str) -> str:
@@ -52,17 +138,12 @@ class ShellCommandExecutor:
             # Reset alternate screen tracking for this command
             self.used_alternate_screen = False
 
-            # Ensure we start from the correct directory
-            self._sync_directory_state()
-
             # Handle special built-in commands that need state management
             if self._handle_builtin_command(command):
-                # After handling cd, make sure Python is in the right place
-                self._sync_directory_state()
-                return self._get_builtin_output(command)
-
-            # Execute with PTY
-            result = self._execute_with_pty(command)
+                result = self._get_builtin_output(command)
+            else:
+                # Execute with PTY
+                result = self._execute_with_pty(command)
 
             # Sync directory state after execution
             self._sync_directory_state()
@@ -100,6 +181,7 @@ class ShellCommandExecutor:
             # Clear output buffer
             self.output_buffer.clear()
             self.stop_io.clear()
+            self._drain_wake_pipe()
 
             # Save terminal settings
             if sys.stdin.isatty():
@@ -108,35 +190,38 @@ class ShellCommandExecutor:
             # Create PTY pair
             self.master_fd, self.slave_fd = pty.openpty()
 
+            # Non-blocking fds let the I/O thread drain everything that is
+            # ready in a single wakeup instead of one read per select()
+            os.set_blocking(self.master_fd, False)
+            if sys.stdin.isatty():
+                self.stdin_was_blocking = os.get_blocking(sys.stdin.fileno())
+                os.set_blocking(sys.stdin.fileno(), False)
+
             # KEEP: Set PTY size to match terminal
             self._set_pty_size(self.master_fd)
 
             # Get user's shell
             user_shell = os.environ.get("SHELL", "/bin/bash")
 
-            # KEEP: Build command that explicitly sources config files and then runs the command
-            if "bash" in user_shell:
-                wrapped_command = f"[ -f ~/.bashrc ] && source ~/.bashrc; {command}"
-            elif "zsh" in user_shell:
-                wrapped_command = f"[ -f ~/.zshrc ] && source ~/.zshrc; {command}"
-            else:
-                wrapped_command = command
+            # Inherit our environment unless variables were overridden
+            env = {**os.environ, **self.env_overrides} if self.env_overrides else None
 
             # KEEP: Create the process with PTY (this works for aliases!)
-            self.process = subprocess.Popen(
-                [user_shell, "-i", "-c", wrapped_command],
-                stdin=self.slave_fd,
-                stdout=self.slave_fd,
-                stderr=self.slave_fd,
-                cwd=self.current_dir,
-                env=self.env_vars,
-                preexec_fn=os.setsid if os.name != "nt" else None,
-            )
+            # An interactive (-i) bash/zsh sources ~/.bashrc/~/.zshrc on its
+            # own before parsing the command, so it is not sourced again here
+            self.process = self._spawn_shell([user_shell, "-i", "-c", command], env)
 
             # Close slave end in parent process
             os.close(self.slave_fd)
             self.slave_fd = None
 
+            # A pidfd becomes readable when the process exits, letting the I/O
+            # thread block instead of polling (Linux 5.3+, Python 3.9+)
+            try:
+                self.pidfd = os.pidfd_open(self.process.pid)
+            except (AttributeError, OSError):
+                self.pidfd = None
+
             # KEEP: Set terminal to raw mode if we're in a TTY
             if sys.stdin.isatty():
                 tty.setraw(sys.stdin.fileno())
@@ -150,20 +235,17 @@ class ShellCommandExecutor:
 
             # Stop I/O thread and give it time to capture final output
             self.stop_io.set()
+            self._wake_io_thread()
             if self.io_thread:
                 self.io_thread.join(timeout=1.0)
 
-            # Update directory state
-            self._update_directory_state()
-
-            # Get the captured output for conversation history
-            captured_output = "".join(self.output_buffer).strip()
-
-            # Clean ANSI escape codes from output for better conversation history
-            import re
-
-            clean_output = re.sub(r"\x1b\[[0-9;]*[mK]", "", captured_output)
-            clean_output = clean_output.strip()
+            # Get the captured output for conversation history, cleaning ANSI
+            # escape codes on the raw bytes before the single decode
+            clean_output = (
+                _ANSI_RE.sub(b"", self.output_buffer)
+                .decode("utf-8", errors="replace")
+                .strip()
+            )
 
             # Return appropriate output based on exit code
             if exit_code == 0:
@@ -187,99 +269,132 @@ class ShellCommandExecutor:
         finally:
             self._cleanup_pty()
 
+    def _spawn_shell(
+        self, argv: List[str], env: Optional[Dict[str, str]]
+    ) -> Union[subprocess.Popen, _SpawnedProcess]:
+        """Start the shell in a new session with the PTY slave as its stdio."""
+        if self.use_posix_spawn:
+            try:
+                # posix_spawn avoids copying our page tables and running Python
+                # between fork and exec, which preexec_fn forces on Popen. It
+                # has no cwd argument, so the child inherits ours; something
+                # else in the process may have moved it away from current_dir.
+                if os.getcwd() != self.current_dir:
+                    os.chdir(self.current_dir)
+                pid = os.posix_spawnp(
+                    argv[0],
+                    argv,
+                    os.environ if env is None else env,
+                    file_actions=[
+                        (os.POSIX_SPAWN_DUP2, self.slave_fd, 0),
+                        (os.POSIX_SPAWN_DUP2, self.slave_fd, 1),
+                        (os.POSIX_SPAWN_DUP2, self.slave_fd, 2),
+                        # Close the PTY pair and anything else we inherited
+                        (os.POSIX_SPAWN_CLOSEFROM, 3),
+                    ],
+                    setsid=True,
+                    # Undo the SIGPIPE/SIGXFSZ ignores Python installs, as
+                    # Popen's restore_signals does
+                    setsigdef=_RESTORED_SIGNALS,
+                    setsigmask=(),
+                )
+                return _SpawnedProcess(pid)
+            except NotImplementedError:
+                # The setsid flag is not supported here; don't try again
+                self.use_posix_spawn = False
+
+        return subprocess.Popen(
+            argv,
+            stdin=self.slave_fd,
+            stdout=self.slave_fd,
+            stderr=self.slave_fd,
+            cwd=self.current_dir,
+            env=env,
+            preexec_fn=os.setsid if os.name != "nt" else None,
+        )
+
     def _handle_pty_io(self):
         """Handle bidirectional I/O between terminal and process."""
-        raw_mode_set = False
+        self.raw_mode_set = False
+        stdout_is_tty = sys.stdout.isatty()
+        selector = selectors.DefaultSelector()
         try:
-            while (
-                not self.stop_io.is_set()
-                and self.process
-                and self.process.poll() is None
-            ):
-                # Check for available input/output with timeout
-                ready_fds = []
+            # Register the fds once; the selector only reports ready ones
+            stdin_fd = sys.stdin.fileno() if sys.stdin.isatty() else None
+            selector.register(self.master_fd, selectors.EVENT_READ)
+            if stdin_fd is not None:
+                selector.register(stdin_fd, selectors.EVENT_READ)
+
+            # The pidfd wakes us up when the process exits; without it we are
+            # woken through the wake pipe once the main thread sees the exit
+            selector.register(self.wake_r, selectors.EVENT_READ)
+            if self.pidfd is not None:
+                selector.register(self.pidfd, selectors.EVENT_READ)
+
+            # Offset of output not yet delivered to the callback
+            callback_offset = len(self.output_buffer)
+            last_callback = time.monotonic() - _CALLBACK_INTERVAL
+
+            # Exit is reported by the pidfd (or stop_io once the main thread
+            # has waited for the process), so there is no waitpid per loop
+            self.child_exited = False
+            while not self.stop_io.is_set() and not self.child_exited:
+                # Wait for available input/output, but no longer than the
+                # callback window while undelivered output is pending
+                timeout = None
+                if self.output_callback and len(self.output_buffer) > callback_offset:
+                    timeout = max(
+                        0.0, last_callback + _CALLBACK_INTERVAL - time.monotonic()
+                    )
                 try:
-                    fds_to_check = [self.master_fd]
-                    if sys.stdin.isatty():
-                        fds_to_check.append(sys.stdin)
-
-                    ready_fds, _, _ = select.select(fds_to_check, [], [], 0.1)
+                    events = selector.select(timeout)
                 except (OSError, ValueError):
                     break
 
-                for fd in ready_fds:
+                for key, _ in events:
                     try:
-                        if fd == sys.stdin and sys.stdin.isatty():
-                            # Read from terminal and send to process
-                            data = os.read(sys.stdin.fileno(), 1024)
-                            if data and self.master_fd:
-                                os.write(self.master_fd, data)
-
-                        elif fd == self.master_fd:
-                            # Read from process and send to terminal/capture
-                            data = os.read(self.master_fd, 4096)
-                            if data:
-                                # DYNAMIC: Detect alternate screen usage
-                                data_str = data.decode("utf-8", errors="ignore")
-
-                                # Check for alternate screen entry sequences
-                                if any(
-                                    seq in data_str
-                                    for seq in [
-                                        "\x1b[?1049h",  # Alternate screen buffer
-                                        "\x1b[?47h",  # Alternate screen (older)
-                                        "\x1b[?1047h",  # Alternate screen (xterm)
-                                    ]
-                                ):
-                                    self.used_alternate_screen = True
-
-                                # Check if we need to switch to raw mode
-                                if not raw_mode_set and sys.stdin.isatty():
-                                    # Look for signs that a program wants raw mode
-                                    if any(
-                                        seq in data_str
-                                        for seq in [
-                                            "\x1b[?1049h",  # Alternate screen buffer
-                                            "\x1b[?1h",  # Application cursor keys
-                                            "\x1b[?47h",  # Alternate screen
-                                            "\x1b=",  # Application keypad mode
-                                        ]
-                                    ):
-                                        try:
-                                            tty.setraw(sys.stdin.fileno())
-                                            raw_mode_set = True
-                                        except Exception:
-                                            pass
-
-                                # Always write to terminal (shows colors!)
-                                if sys.stdout.isatty():
-                                    os.write(sys.stdout.fileno(), data)
-                                    sys.stdout.flush()
-
-                                # Capture output for non-interactive commands
+                        if key.fd == stdin_fd:
+                            # Drain terminal input and send it to the process
+                            stdin_chunks = []
+                            while True:
                                 try:
-                                    text = data.decode("utf-8", errors="replace")
-                                    self.output_buffer.append(text)
-
-                                    # Call output callback if set
-                                    if self.output_callback:
-                                        self.output_callback(text)
-                                except Exception:
-                                    pass
-                            else:
-                                # EOF from process
-                                break
+                                    data = os.read(stdin_fd, 8192)
+                                except BlockingIOError:
+                                    break
+                                if not data:
+                                    break
+                                stdin_chunks.append(data)
+                            if stdin_chunks and self.master_fd:
+                                self._write_all(self.master_fd, stdin_chunks)
+
+                        elif key.fd == self.master_fd:
+                            self._drain_master(stdout_is_tty, stdin_fd)
+
+                        elif key.fd == self.pidfd:
+                            self.child_exited = True
 
                     except (OSError, ValueError):
                         # Handle broken pipe or closed file descriptor
                         break
 
+                # Batch callback deliveries into windows instead of one per read
+                now = time.monotonic()
+                if now - last_callback >= _CALLBACK_INTERVAL:
+                    callback_offset = self._send_output(callback_offset)
+                    last_callback = now
+
+            # Pick up whatever the process wrote right before exiting
+            self._drain_master(stdout_is_tty, stdin_fd)
+            self._send_output(callback_offset)
+
         except Exception:
             # Log error but don't crash
             pass
         finally:
+            selector.close()
+
             # Restore terminal if we set raw mode
-            if raw_mode_set and self.original_settings and sys.stdin.isatty():
+            if self.raw_mode_set and self.original_settings and sys.stdin.isatty():
                 try:
                     termios.tcsetattr(
                         sys.stdin.fileno(), termios.TCSADRAIN, self.original_settings
@@ -287,11 +402,115 @@ class ShellCommandExecutor:
                 except Exception:
                     pass
 
+    def _drain_master(self, stdout_is_tty: bool, stdin_fd: Optional[int]):
+        """Read everything available from the process and send to terminal/capture."""
+        # Reads land in the preallocated buffer, which is written to the
+        # terminal in one go whenever it fills up or the PTY runs dry
+        view = self.read_view
+        filled = 0
+        while True:
+            try:
+                size = os.readv(self.master_fd, [view[filled:]])
+            except BlockingIOError:
+                break
+            except OSError:
+                # EIO once the process closed its side of the PTY
+                break
+            if not size:
+                # EOF from process
+                break
+            data = view[filled : filled + size]
+            filled += size
+
+            # DYNAMIC: Detect alternate screen usage
+            if not self.used_alternate_screen and _ALT_SCREEN_RE.search(data):
+                self.used_alternate_screen = True
+
+            # Check if we need to switch to raw mode
+            if (
+                not self.raw_mode_set
+                and stdin_fd is not None
+                and _RAW_MODE_RE.search(data)
+            ):
+                try:
+                    tty.setraw(stdin_fd)
+                    self.raw_mode_set = True
+                except Exception:
+                    pass
+
+            # Capture raw output; it is decoded once when needed
+            self.output_buffer.extend(data)
+
+            if filled == len(view):
+                # Always write to terminal (shows colors!)
+                if stdout_is_tty:
+                    self._write_all(sys.stdout.fileno(), [view])
+                filled = 0
+
+        if filled and stdout_is_tty:
+            self._write_all(sys.stdout.fileno(), [view[:filled]])
+
+    def _send_output(self, offset: int) -> int:
+        """Pass output captured since offset to the callback; return new offset."""
+        end = len(self.output_buffer)
+        if self.output_callback and end > offset:
+            try:
+                self.output_callback(bytes(memoryview(self.output_buffer)[offset:end]))
+            except Exception:
+                pass
+        return end
+
+    def _wake_io_thread(self):
+        """Wake the I/O thread so it notices stop_io without waiting for output."""
+        try:
+            os.write(self.wake_w, b"x")
+        except BlockingIOError:
+            # Pipe already full, so the thread is going to wake up anyway
+            pass
+
+    def _drain_wake_pipe(self):
+        """Discard wake-ups left over from a previous command."""
+        try:
+            while os.read(self.wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _write_all(self, fd: int, chunks: List[Union[bytes, memoryview]]):
+        """Write all chunks to fd with as few writev() calls as possible."""
+        views = [memoryview(chunk) for chunk in chunks]
+        while views:
+            try:
+                written = os.writev(fd, views[:_IOV_MAX])
+            except BlockingIOError:
+                # The terminal shares stdin's file description, so it may be
+                # non-blocking too; wait until it can accept more output
+                select.select([], [fd], [])
+                continue
+
+            # Drop fully written chunks and trim a partially written one
+            while written:
+                if written >= len(views[0]):
+                    written -= len(views[0])
+                    views.pop(0)
+                else:
+                    views[0] = views[0][written:]
+                    written = 0
+
     def _cleanup_pty(self):
         """Clean up PTY resources and restore terminal settings."""
         try:
             # Stop I/O thread
             self.stop_io.set()
+            self._wake_io_thread()
+
+            # Restore stdin blocking mode before writing to the terminal
+            if self.stdin_was_blocking is not None:
+                try:
+                    os.set_blocking(sys.stdin.fileno(), self.stdin_was_blocking)
+                except Exception:
+                    pass
+                self.stdin_was_blocking = None
 
             # DYNAMIC CURSOR FIX: Only fix cursor if alternate screen was used
             if self.used_alternate_screen and sys.stdout.isatty():
@@ -308,8 +527,12 @@ class ShellCommandExecutor:
                         sys.stdout.write(seq)
                     sys.stdout.flush()
 
-                    # Very small delay to let terminal process
-                    time.sleep(0.005)
+                    # Wait until the terminal has actually taken the output,
+                    # which returns immediately when it is idle
+                    try:
+                        termios.tcdrain(sys.stdout.fileno())
+                    except termios.error:
+                        pass
 
                 except Exception:
                     pass
@@ -319,7 +542,7 @@ class ShellCommandExecutor:
                 try:
                     # Check if we need a newline
                     # This helps with commands that don't end with a newline
-                    if self.output_buffer and not self.output_buffer[-1].endswith("\n"):
+                    if self.output_buffer and not self.output_buffer.endswith(b"\n"):
                         sys.stdout.write("\n")
                         sys.stdout.flush()
                 except Exception:
@@ -356,38 +579,53 @@ class ShellCommandExecutor:
                     if self.process.poll() is None:
                         # Try graceful termination first
                         os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-                        time.sleep(0.1)
-                        if self.process.poll() is None:
+                        if not self._wait_for_exit(0.1):
                             # Force kill if still running
                             os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
                 except Exception:
                     pass
                 self.process = None
 
+            if self.pidfd is not None:
+                try:
+                    os.close(self.pidfd)
+                except Exception:
+                    pass
+                self.pidfd = None
+
         except Exception:
             pass
 
-    def _update_directory_state(self):
-        """Try to detect if the working directory changed during command execution."""
-        # After command execution, ensure Python process is in the right directory
-        self._sync_directory_state()
+    def _wait_for_exit(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the process to exit."""
+        if self.pidfd is not None:
+            # The pidfd turns readable the moment the process exits
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.pidfd, selectors.EVENT_READ)
+                selector.select(timeout)
+        else:
+            deadline = time.monotonic() + timeout
+            while self.process.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.001)
+        return self.process.poll() is not None
 
     def _handle_builtin_command(self, command: str) -> bool:
         """Handle commands that need special state management."""
-        cmd_parts = command.strip().split()
-        if not cmd_parts:
-            return False
-
         # Only handle cd for state persistence
         # Let the shell handle export, unset, etc. normally
-        return cmd_parts[0] == "cd"
+        # Check the first word without splitting the whole command
+        stripped = command.lstrip()
+        return stripped.startswith("cd") and (
+            len(stripped) == 2 or stripped[2].isspace()
+        )
 
     def _get_builtin_output(self, command: str) -> str:
         """Execute built-in commands with state persistence."""
-        cmd_parts = command.strip().split()
-        cmd = cmd_parts[0]
-
         try:
+            # shlex keeps quoted paths with spaces together
+            cmd_parts = shlex.split(command)
+            cmd = cmd_parts[0]
+
             if cmd == "cd":
                 return self._handle_cd_command(cmd_parts)
             else:
@@ -420,12 +658,13 @@ class ShellCommandExecutor:
             if os.path.isdir(resolved_path):
                 self.previous_dir = self.current_dir
                 self.current_dir = resolved_path
+                self.cwd_dirty = True
 
                 # ACTUALLY change the Python process's working directory
                 os.chdir(resolved_path)
 
                 # Update the environment variable
-                self.env_vars["PWD"] = resolved_path
+                self.env_overrides["PWD"] = resolved_path
                 return ""
             else:
                 return f"❌ cd: no such file or directory: {cmd_parts[1] if len(cmd_parts) > 1 else '~'}"
@@ -449,21 +688,34 @@ class ShellCommandExecutor:
 
     def get_shell_history(self) -> list:
         """Get the shell command history."""
-        return self.shell_history.copy()
+        return list(self.shell_history)
 
     def get_last_output(self) -> str:
         """Get the captured output from the last command."""
-        return "".join(self.output_buffer)
+        return self.output_buffer.decode("utf-8", errors="replace")
 
     def reset_state(self):
         """Reset shell state to initial values."""
         self.current_dir = os.getcwd()
-        self.env_vars = os.environ.copy()
-        self.shell_history = []
-        self.output_buffer = []
+        self.cwd_dirty = False
+        self.env_overrides = {}
+        self.shell_history = deque(maxlen=_MAX_HISTORY)
+        self.output_buffer = bytearray()
+
+    def close(self):
+        """Release the executor's file descriptors; it cannot run commands after."""
+        if self.wake_r is not None:
+            os.close(self.wake_r)
+            os.close(self.wake_w)
+            self.wake_r = self.wake_w = None
 
     def _sync_directory_state(self):
         """Synchronize Python's working directory with tracked state."""
+        # Only cd changes the tracked directory, so skip getcwd() otherwise
+        if not self.cwd_dirty:
+            return
+        self.cwd_dirty = False
+
         try:
             current_actual = os.getcwd()
             if current_actual != self.current_dir:
@@ -472,4 +724,4 @@ class ShellCommandExecutor:
         except Exception:
             # If we can't change to tracked directory, update tracking to match reality
             self.current_dir = os.getcwd()
-            self.env_vars["PWD"] = self.current_dir
+            self.env_overrides["PWD"] = self.current_dir
@@ -34,6 +34,7 @@ class MockShellExecutor:
         self.executed_commands = []
         self.interrupt_called = False
         self.should_interrupt = True
+        self.closed = False
 
     def execute_shell_command(self, command):
         self.executed_commands.append(command)
@@ -43,6 +44,9 @@ class MockShellExecutor:
         self.interrupt_called = True
         return self.should_interrupt
 
+    def close(self):
+        self.closed = True
+
 
 class MockShellDetector:
     """Mock shell detector for testing."""
@@ -669,6 +673,7 @@ class TestCLIControllerLifecycle:
         controller._cleanup()
 
         assert not controller.running
+        assert controller.shell_executor.closed
 
 
 class TestCLIControllerStatistics:
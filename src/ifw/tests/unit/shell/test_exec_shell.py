@@ -0,0 +1,168 @@
+"""
+Unit tests for ShellCommandExecutor.
+Uses pure pytest - builtins run in-process, other commands run bash in a PTY.
+"""
+
+import os
+import pty
+import shutil
+import threading
+import time
+
+import pytest
+
+from ifw.shell import exec_shell
+from ifw.shell.exec_shell import ShellCommandExecutor
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    """Executor rooted in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    executor = ShellCommandExecutor()
+    yield executor
+    executor.close()
+
+
+@pytest.fixture
+def bash_env(tmp_path, monkeypatch):
+    """Run commands with bash and an empty home so no rc files interfere."""
+    bash = shutil.which("bash")
+    if bash is None:
+        pytest.skip("bash is not available")
+    monkeypatch.setenv("SHELL", bash)
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+
+class TestBuiltinDetection:
+    """Test detection of commands handled in-process."""
+
+    @pytest.mark.parametrize(
+        "command", ["cd", "cd /tmp", "  cd ..", "cd\t/tmp", "cd   ", "cd\n"]
+    )
+    def test_cd_is_builtin(self, executor, command):
+        assert executor._handle_builtin_command(command)
+
+    @pytest.mark.parametrize(
+        "command", ["", "   ", "ls", "cdx", "cd_tool --help", "echo cd", "c d"]
+    )
+    def test_other_commands_are_not_builtin(self, executor, command):
+        assert not executor._handle_builtin_command(command)
+
+
+class TestCdCommand:
+    """Test cd state handling."""
+
+    def test_cd_into_directory(self, executor, tmp_path):
+        (tmp_path / "sub").mkdir()
+
+        assert executor.execute_shell_command("cd sub") == ""
+        assert executor.get_current_directory() == str(tmp_path / "sub")
+        assert os.getcwd() == str(tmp_path / "sub")
+
+    def test_cd_quoted_path_with_spaces(self, executor, tmp_path):
+        (tmp_path / "my dir").mkdir()
+
+        assert executor.execute_shell_command('cd "my dir"') == ""
+        assert executor.get_current_directory() == str(tmp_path / "my dir")
+
+    def test_cd_dash_returns_to_previous(self, executor, tmp_path):
+        (tmp_path / "sub").mkdir()
+
+        executor.execute_shell_command("cd sub")
+        executor.execute_shell_command("cd -")
+        assert executor.get_current_directory() == str(tmp_path)
+
+    def test_cd_missing_directory(self, executor, tmp_path):
+        result = executor.execute_shell_command("cd missing")
+
+        assert result.startswith("❌ cd: no such file or directory")
+        assert executor.get_current_directory() == str(tmp_path)
+
+    def test_cd_unbalanced_quote(self, executor, tmp_path):
+        result = executor.execute_shell_command('cd "my dir')
+
+        assert result.startswith("❌ Error in builtin command")
+        assert executor.get_current_directory() == str(tmp_path)
+
+
+class TestPtyCommand:
+    """Test commands run through the PTY."""
+
+    def test_pipeline_with_early_closing_reader(self, executor, bash_env):
+        # The writer must die of SIGPIPE rather than report a write error
+        assert executor.execute_shell_command("yes | head -1") == "y"
+
+    def test_runs_in_tracked_directory(self, executor, bash_env, tmp_path):
+        (tmp_path / "elsewhere").mkdir()
+        os.chdir(tmp_path / "elsewhere")
+
+        assert executor.execute_shell_command("pwd") == str(tmp_path)
+
+    def test_does_not_leak_inheritable_fds(self, executor, bash_env):
+        fd = os.open(os.devnull, os.O_RDONLY)
+        try:
+            os.set_inheritable(fd, True)
+            listing = executor.execute_shell_command("ls /proc/self/fd")
+        finally:
+            os.close(fd)
+
+        assert str(fd) not in listing.split()
+
+    def test_unsupported_posix_spawn_is_not_retried(
+        self, executor, bash_env, monkeypatch
+    ):
+        calls = []
+
+        def posix_spawnp(*args, **kwargs):
+            calls.append(args)
+            raise NotImplementedError("setsid unavailable")
+
+        monkeypatch.setattr(os, "posix_spawnp", posix_spawnp, raising=False)
+        monkeypatch.setattr(os, "POSIX_SPAWN_CLOSEFROM", 3, raising=False)
+        executor.use_posix_spawn = True
+
+        assert executor.execute_shell_command("echo one") == "one"
+        assert executor.execute_shell_command("echo two") == "two"
+        assert len(calls) == 1
+
+
+class TestOutputCallback:
+    """Test real-time output delivery from the PTY I/O loop."""
+
+    def test_batches_are_bytes_coalesced_and_flushed(self, executor, monkeypatch):
+        # A long window so everything after the first batch is held back
+        monkeypatch.setattr(exec_shell, "_CALLBACK_INTERVAL", 60.0)
+        batches = []
+        executor.set_output_callback(batches.append)
+
+        master_fd, slave_fd = pty.openpty()
+        os.set_blocking(master_fd, False)
+        executor.master_fd = master_fd
+        io_thread = threading.Thread(target=executor._handle_pty_io)
+        io_thread.start()
+        try:
+            # The first output is delivered straight away
+            os.write(slave_fd, b"first")
+            deadline = time.monotonic() + 5
+            while not batches and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert batches == [b"first"]
+
+            # Later output is held for the rest of the window
+            os.write(slave_fd, b"second")
+            os.write(slave_fd, b"third")
+            time.sleep(0.1)
+            assert batches == [b"first"]
+
+        finally:
+            executor.stop_io.set()
+            executor._wake_io_thread()
+            io_thread.join(5)
+            os.close(slave_fd)
+            os.close(master_fd)
+
+        # The held output is flushed in one batch when the loop stops
+        assert not io_thread.is_alive()
+        assert batches == [b"first", b"secondthird"]
+        assert bytes(executor.output_buffer) == b"firstsecondthird"